@@ -3,14 +3,20 @@ Nova Act HTTP service — runs nutrition lookup and grocery search.
 Deploy to Railway, Render, or any Python-friendly host. Set ACT_SERVICE_URL
 in your Next.js app to use this instead of local Python spawn.
 """
+import functools
+import hmac
 import json
 import os
 import re
 import subprocess
 import sys
+import tempfile
+import time
 from pathlib import Path
 
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, g, jsonify, request, make_response
+
+import profiling
 
 app = Flask(__name__)
 
@@ -81,6 +87,46 @@ _basedir = Path(__file__).resolve().parent
 SCRIPT_DIR = _basedir / "scripts" if (_basedir / "scripts").exists() else _basedir.parent / "scripts"
 NUTRITION_SCRIPT = SCRIPT_DIR / "nova_act_nutrition.py"
 GROCERY_SCRIPT = SCRIPT_DIR / "nova_act_grocery.py"
+PROFILER_SCRIPT = _basedir / "profiling.py"
+
+
+def _run_profiled(script_path: Path, stdin: bytes, timeout: int, env: dict, profile) -> subprocess.CompletedProcess:
+    """subprocess.run equivalent that runs the script under the profiler and records child/browser RSS."""
+    fd, out_path = tempfile.mkstemp(prefix="act-profile-", suffix=".json")
+    os.close(fd)
+    env.update(profile.child_env(out_path))
+    cmd = [sys.executable, str(PROFILER_SCRIPT), str(script_path)]
+    started = time.time()
+    with subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=str(SCRIPT_DIR.parent),
+        env=env,
+    ) as popen:
+        monitor = profiling.RssMonitor(popen.pid).start()
+        try:
+            stdout, stderr = popen.communicate(stdin, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            popen.kill()
+            popen.communicate()
+            raise
+        finally:
+            child = {
+                "script": script_path.name,
+                "durationMs": round((time.time() - started) * 1000),
+                "rss": monitor.stop(),
+            }
+            try:
+                with open(out_path) as f:
+                    child.update(json.load(f))
+            except (OSError, ValueError):
+                child["note"] = "Child profile unavailable (script killed or crashed)"
+            finally:
+                os.unlink(out_path)
+            profile.children.append(child)
+    return subprocess.CompletedProcess(cmd, popen.returncode, stdout, stderr)
 
 
 def run_script(script_path: Path, input_json: dict, timeout: int = 120) -> dict:
@@ -89,15 +135,19 @@ def run_script(script_path: Path, input_json: dict, timeout: int = 120) -> dict:
         return {"error": f"Script not found: {script_path}"}
     env = os.environ.copy()
     env["PYTHONUNBUFFERED"] = "1"
+    profile = g.get("profile")
     try:
-        proc = subprocess.run(
-            [sys.executable, str(script_path)],
-            input=json.dumps(input_json).encode(),
-            capture_output=True,
-            timeout=timeout,
-            cwd=str(SCRIPT_DIR.parent),
-            env=env,
-        )
+        if profile is not None:
+            proc = _run_profiled(script_path, json.dumps(input_json).encode(), timeout, env, profile)
+        else:
+            proc = subprocess.run(
+                [sys.executable, str(script_path)],
+                input=json.dumps(input_json).encode(),
+                capture_output=True,
+                timeout=timeout,
+                cwd=str(SCRIPT_DIR.parent),
+                env=env,
+            )
         stderr_text = proc.stderr.decode()[:500]
         if stderr_text:
             print(f"[run_script] stderr: {stderr_text}", file=sys.stderr, flush=True)
@@ -132,11 +182,115 @@ def run_script(script_path: Path, input_json: dict, timeout: int = 120) -> dict:
         return {"error": f"Invalid response: {e}", "raw": proc.stdout.decode()[:200] if proc else ""}
 
 
+# Only lookups claim profiling budget — health checks, admin routes and 404s never do.
+PROFILED_ENDPOINTS = {"nutrition", "grocery"}
+
+
+@app.before_request
+def start_profile():
+    # Disarmed: one None check, nothing else.
+    if profiling.session() is None or request.endpoint not in PROFILED_ENDPOINTS:
+        return
+    g.profile = profiling.begin_request(f"{request.method} {request.path}")
+
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profiling.end_request(profile, response.status_code)
+    return response
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"ok": True, "service": "refactor-act"})
 
 
+# --- Admin: on-demand profiling ---------------------------------------------
+# Disabled (404) unless ACT_ADMIN_TOKEN is set; callers send "Authorization: Bearer <token>".
+# State is per process — run with a single gunicorn worker (as the Procfile/Dockerfile do).
+ADMIN_TOKEN = os.environ.get("ACT_ADMIN_TOKEN", "")
+
+
+def admin_required(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Not found"}), 404
+        supplied = request.headers.get("Authorization", "").encode()
+        if not hmac.compare_digest(supplied, f"Bearer {ADMIN_TOKEN}".encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _bounded_int(data: dict, key: str, default: int, low: int, high: int) -> int:
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{key} must be an integer between {low} and {high}")
+    return value
+
+
+@app.route("/admin/profile", methods=["POST"])
+@admin_required
+def admin_profile_arm():
+    # An empty body arms with defaults; anything else must be a JSON object.
+    data = request.get_json(silent=True) if request.get_data() else {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    try:
+        session = profiling.arm(
+            requests=_bounded_int(data, "requests", 5, 1, 50),
+            interval_ms=_bounded_int(data, "intervalMs", 10, 1, 1000),
+            trace_frames=_bounded_int(data, "traceFrames", 10, 1, 50),
+            top=_bounded_int(data, "top", 15, 1, 100),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(session.describe())
+
+
+@app.route("/admin/profile", methods=["GET"])
+@admin_required
+def admin_profile_status():
+    session = profiling.session()
+    if session is None:
+        return jsonify({"armed": False, "reports": []})
+    return jsonify(session.describe())
+
+
+@app.route("/admin/profile/collapsed", methods=["GET"])
+@admin_required
+def admin_profile_collapsed():
+    """Collapsed stacks for all captured requests — pipe into flamegraph.pl or load in speedscope."""
+    session = profiling.session()
+    body = session.collapsed() if session is not None else ""
+    return make_response(body + "\n" if body else "", 200, {"Content-Type": "text/plain; charset=utf-8"})
+
+
+@app.route("/admin/profile", methods=["DELETE"])
+@admin_required
+def admin_profile_disarm():
+    profiling.disarm()
+    return jsonify({"armed": False})
+
+
+@app.route("/admin/memory", methods=["GET"])
+@admin_required
+def admin_memory():
+    pid = os.getpid()
+    children = [
+        {"pid": p["pid"], "name": p["name"], "rssKb": p["rssKb"]}
+        for p in profiling.process_tree(pid)
+    ]
+    out = {"pid": pid, "rssKb": profiling.rss_kb(pid), "children": children}
+    session = profiling.session()
+    if session is not None:
+        out["tracemalloc"] = session.memory_snapshot()
+    return jsonify(out)
+
+
 # Fallback nutrition when script fails (timeout, crash, missing deps) — avoid 500 so UI can still show something
 _DEMO_NUTRITION = {"calories": 150, "protein": 10, "carbs": 15, "fat": 5}
 
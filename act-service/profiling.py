@@ -0,0 +1,379 @@
+"""
+On-demand profiling for the Nova Act service.
+
+Nothing here runs until an admin arms a session (see the /admin/profile routes
+in app.py). While disarmed the request hooks return after a single ``None``
+check, no sampler threads exist and tracemalloc is stopped.
+
+When armed, the next N requests get:
+  - wall-clock stack samples of the Flask request thread (collapsed stacks)
+  - a tracemalloc snapshot diff of the service process
+  - the same for the spawned nova_act_*.py script, which is launched through
+    this module (``python profiling.py <script>``) so the scripts stay untouched
+  - peak RSS of the script process and of its Chromium descendants
+
+Collapsed stacks use the "frame;frame;frame count" format understood by
+flamegraph.pl, speedscope and inferno.
+"""
+import collections
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_OUT_ENV = "ACT_PROFILE_OUT"
+PROFILE_INTERVAL_ENV = "ACT_PROFILE_INTERVAL"
+PROFILE_FRAMES_ENV = "ACT_PROFILE_FRAMES"
+PROFILE_TOP_ENV = "ACT_PROFILE_TOP"
+
+PROC_ROOT = "/proc"
+_BROWSER_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+# --- Stack sampling ---------------------------------------------------------
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples thread stacks from a daemon thread every ``interval`` seconds."""
+
+    def __init__(self, interval: float, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="act-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_ids is None and len(names) != len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in frames.items():
+                if tid == own_id or (self.thread_ids is not None and tid not in self.thread_ids):
+                    continue
+                stack = _collapse(frame)
+                if self.thread_ids is None:
+                    stack = f"{names.get(tid, tid)};{stack}"
+                self.counts[stack] += 1
+            self.samples += 1
+
+    def collapsed(self, prefix: str = "") -> str:
+        head = f"{prefix};" if prefix else ""
+        return "\n".join(f"{head}{stack} {n}" for stack, n in self.counts.most_common())
+
+
+# --- Memory -----------------------------------------------------------------
+
+
+def take_snapshot():
+    """tracemalloc snapshot without the profiler's own allocations."""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+
+
+def snapshot_diff(before, after, top: int) -> list:
+    """Top allocation deltas between two tracemalloc snapshots, by line."""
+    stats = after.compare_to(before, "lineno")
+    out = []
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        out.append({
+            "file": frame.filename,
+            "line": frame.lineno,
+            "sizeDiffKb": round(stat.size_diff / 1024, 1),
+            "sizeKb": round(stat.size / 1024, 1),
+            "countDiff": stat.count_diff,
+        })
+    return out
+
+
+def _proc_status(pid: int) -> dict:
+    """Name, parent pid and RSS (kB) from /proc; empty when unavailable."""
+    try:
+        with open(f"{PROC_ROOT}/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except (OSError, ValueError):
+        return {}
+    rss = fields.get("VmRSS", "0 kB").split()[0]
+    return {
+        "name": fields.get("Name", "").strip(),
+        "ppid": int(fields.get("PPid", "0").strip() or 0),
+        "rssKb": int(rss) if rss.isdigit() else 0,
+    }
+
+
+def rss_kb(pid: int | None = None):
+    """Resident set size of a process in kB, or None off Linux."""
+    return _proc_status(pid or os.getpid()).get("rssKb")
+
+
+def process_tree(root: int) -> list:
+    """All live descendants of ``root`` (excluding root) as /proc status dicts."""
+    try:
+        pids = [int(p) for p in os.listdir(PROC_ROOT) if p.isdigit()]
+    except OSError:
+        return []
+    procs = {}
+    for pid in pids:
+        status = _proc_status(pid)
+        if status:
+            procs[pid] = dict(status, pid=pid)
+    children = collections.defaultdict(list)
+    for pid, status in procs.items():
+        children[status["ppid"]].append(pid)
+    out, queue = [], list(children.get(root, []))
+    while queue:
+        pid = queue.pop()
+        out.append(procs[pid])
+        queue.extend(children.get(pid, []))
+    return out
+
+
+def _is_browser(name: str) -> bool:
+    lower = name.lower()
+    return any(b in lower for b in _BROWSER_NAMES)
+
+
+class RssMonitor:
+    """Polls a child process and its descendants, keeping peak RSS values."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak = {"childKb": 0, "browserKb": 0, "treeKb": 0, "browserProcesses": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="act-rss-monitor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join(timeout=2)
+        return dict(self.peak)
+
+    def _run(self):
+        while True:
+            child = rss_kb(self.pid) or 0
+            tree = process_tree(self.pid)
+            browsers = [p for p in tree if _is_browser(p["name"])]
+            browser = sum(p["rssKb"] for p in browsers)
+            self.peak["childKb"] = max(self.peak["childKb"], child)
+            self.peak["browserKb"] = max(self.peak["browserKb"], browser)
+            self.peak["treeKb"] = max(self.peak["treeKb"], child + sum(p["rssKb"] for p in tree))
+            self.peak["browserProcesses"] = max(self.peak["browserProcesses"], len(browsers))
+            if self._stop.wait(self.interval):
+                break
+
+
+# --- Sessions ---------------------------------------------------------------
+
+
+class ProfileSession:
+    """Armed profiling budget: the next ``requests`` requests are profiled."""
+
+    def __init__(self, requests: int, interval_ms: int, trace_frames: int, top: int):
+        self.requested = requests
+        self.remaining = requests
+        self.interval = interval_ms / 1000
+        self.trace_frames = trace_frames
+        self.top = top
+        self.armed_at = time.time()
+        self.reports = collections.deque(maxlen=requests)
+        self.last_snapshot = None
+        self._lock = threading.Lock()
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def describe(self) -> dict:
+        return {
+            "armed": self.remaining > 0,
+            "requested": self.requested,
+            "remaining": self.remaining,
+            "intervalMs": round(self.interval * 1000),
+            "traceFrames": self.trace_frames,
+            "armedAt": self.armed_at,
+            "reports": [{k: v for k, v in r.items() if k != "collapsed"} for r in self.reports],
+        }
+
+    def memory_snapshot(self) -> dict:
+        """Top live allocations, plus the delta since the previous call, while tracing."""
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        snapshot = take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        out = {
+            "tracing": True,
+            "tracedKb": round(current / 1024, 1),
+            "tracedPeakKb": round(peak / 1024, 1),
+            "top": [
+                {"file": s.traceback[0].filename, "line": s.traceback[0].lineno, "sizeKb": round(s.size / 1024, 1), "count": s.count}
+                for s in snapshot.statistics("lineno")[: self.top]
+            ],
+        }
+        if self.last_snapshot is not None:
+            out["sinceLast"] = snapshot_diff(self.last_snapshot, snapshot, self.top)
+        self.last_snapshot = snapshot
+        return out
+
+    def collapsed(self) -> str:
+        return "\n".join(r["collapsed"] for r in self.reports if r["collapsed"])
+
+
+class RequestProfile:
+    """Profiling state for one request; children are attached by run_script."""
+
+    def __init__(self, session: ProfileSession, label: str):
+        self.session = session
+        self.label = label
+        self.children = []
+        self.started = time.time()
+        self.rss_before = rss_kb()
+        self.snapshot = take_snapshot() if tracemalloc.is_tracing() else None
+        self.sampler = StackSampler(session.interval, {threading.get_ident()}).start()
+
+    def child_env(self, out_path: str) -> dict:
+        return {
+            PROFILE_OUT_ENV: out_path,
+            PROFILE_INTERVAL_ENV: str(self.session.interval),
+            PROFILE_FRAMES_ENV: str(self.session.trace_frames),
+            PROFILE_TOP_ENV: str(self.session.top),
+        }
+
+    def finish(self, status: int) -> dict:
+        self.sampler.stop()
+        memory = {"rssBeforeKb": self.rss_before, "rssAfterKb": rss_kb()}
+        if self.snapshot is not None and tracemalloc.is_tracing():
+            memory["allocations"] = snapshot_diff(self.snapshot, take_snapshot(), self.session.top)
+        stacks = [self.sampler.collapsed(self.label)]
+        for child in self.children:
+            collapsed = child.pop("collapsed", "")
+            if collapsed:
+                stacks.append("\n".join(f"{self.label};{child['script']};{line}" for line in collapsed.splitlines()))
+        report = {
+            "request": self.label,
+            "status": status,
+            "durationMs": round((time.time() - self.started) * 1000),
+            "samples": self.sampler.samples,
+            "memory": memory,
+            "children": self.children,
+            "collapsed": "\n".join(s for s in stacks if s),
+        }
+        self.session.reports.append(report)
+        return report
+
+
+_session: ProfileSession | None = None
+_session_lock = threading.Lock()
+
+
+def arm(requests: int, interval_ms: int, trace_frames: int, top: int) -> ProfileSession:
+    global _session
+    with _session_lock:
+        _session = ProfileSession(requests, interval_ms, trace_frames, top)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(trace_frames)
+        return _session
+
+
+def disarm() -> None:
+    global _session
+    with _session_lock:
+        _session = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def session() -> ProfileSession | None:
+    return _session
+
+
+def begin_request(label: str) -> RequestProfile | None:
+    """Start profiling the current request if a session has budget left."""
+    current = _session
+    if current is None or not current.claim():
+        return None
+    return RequestProfile(current, label)
+
+
+def end_request(profile: RequestProfile, status: int) -> None:
+    profile.finish(status)
+    # Stop tracing once the budget is spent so idle overhead returns to zero;
+    # reports stay readable until the session is disarmed or re-armed.
+    if profile.session.remaining <= 0 and profile.session is _session and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+# --- Child entry point ------------------------------------------------------
+
+
+def _run_child(script: str) -> None:
+    """Run a nova_act_*.py script under the sampler and tracemalloc."""
+    out_path = os.environ.pop(PROFILE_OUT_ENV)
+    interval = float(os.environ.pop(PROFILE_INTERVAL_ENV, "0.01"))
+    frames = int(os.environ.pop(PROFILE_FRAMES_ENV, "10"))
+    top = int(os.environ.pop(PROFILE_TOP_ENV, "15"))
+
+    tracemalloc.start(frames)
+    before = take_snapshot()
+    sampler = StackSampler(interval).start()
+    sys.argv = [script]
+    sys.path[0] = str(Path(script).resolve().parent)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        sampler.stop()
+        # Trace storage lives in the child's RSS; report it so readers can subtract it from childKb/treeKb.
+        overhead = tracemalloc.get_tracemalloc_memory()
+        after = take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        report = {
+            "samples": sampler.samples,
+            "collapsed": sampler.collapsed(),
+            "allocations": snapshot_diff(before, after, top),
+            "tracedPeakKb": round(peak / 1024, 1),
+            "tracemallocOverheadKb": round(overhead / 1024, 1),
+        }
+        with open(out_path, "w") as f:
+            json.dump(report, f)
+
+
+if __name__ == "__main__":
+    _run_child(sys.argv[1])
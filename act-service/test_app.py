@@ -0,0 +1,157 @@
+import os
+import tracemalloc
+
+import pytest
+
+import app as act_app
+import profiling
+
+TOKEN = "test-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(act_app, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(act_app, "run_script", lambda *args, **kwargs: {"food": "rice", "nutrition": {}})
+    yield act_app.app.test_client()
+    profiling.disarm()
+
+
+def test_admin_routes_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(act_app, "ADMIN_TOKEN", "")
+    assert client.get("/admin/profile", headers=AUTH).status_code == 404
+    assert client.post("/admin/profile", json={}, headers=AUTH).status_code == 404
+
+
+def test_admin_routes_reject_wrong_token(client):
+    assert client.get("/admin/profile").status_code == 401
+    assert client.get("/admin/memory", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.delete("/admin/profile", headers={"Authorization": TOKEN}).status_code == 401
+
+
+@pytest.mark.parametrize("body", [[1], [], "requests", 3, 0, False])
+def test_arm_rejects_non_object_body(client, body):
+    resp = client.post("/admin/profile", json=body, headers=AUTH)
+    assert resp.status_code == 400
+    assert profiling.session() is None
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"data": '{"requests": 2,}', "content_type": "application/json"},
+        {"data": "null", "content_type": "application/json"},
+        {"data": {"requests": "2"}},
+    ],
+)
+def test_arm_rejects_malformed_or_form_body(client, kwargs):
+    resp = client.post("/admin/profile", headers=AUTH, **kwargs)
+    assert resp.status_code == 400
+    assert profiling.session() is None
+
+
+def test_arm_with_empty_body_uses_defaults(client):
+    resp = client.post("/admin/profile", headers=AUTH)
+    assert resp.status_code == 200
+    assert resp.get_json()["requested"] == 5
+
+
+def test_arm_profiles_lookups_until_budget_spent(client):
+    resp = client.post("/admin/profile", json={"requests": 2, "intervalMs": 1}, headers=AUTH)
+    assert resp.status_code == 200
+    assert resp.get_json()["remaining"] == 2
+    assert tracemalloc.is_tracing()
+
+    # Health checks and unknown routes never claim budget
+    client.get("/health")
+    client.get("/favicon.ico")
+    assert profiling.session().remaining == 2
+
+    client.post("/nutrition", json={"food": "rice"})
+    client.post("/nutrition", json={"food": "oats"})
+    client.post("/nutrition", json={"food": "eggs"})
+
+    status = client.get("/admin/profile", headers=AUTH).get_json()
+    assert status["armed"] is False
+    assert [r["request"] for r in status["reports"]] == ["POST /nutrition", "POST /nutrition"]
+    assert "allocations" in status["reports"][0]["memory"]
+    assert not tracemalloc.is_tracing()
+
+    collapsed = client.get("/admin/profile/collapsed", headers=AUTH)
+    assert collapsed.content_type.startswith("text/plain")
+
+    assert client.delete("/admin/profile", headers=AUTH).get_json() == {"armed": False}
+    assert profiling.session() is None
+
+
+def test_report_kept_for_every_requested_profile(client):
+    client.post("/admin/profile", json={"requests": 30, "intervalMs": 1}, headers=AUTH)
+    for _ in range(30):
+        client.post("/nutrition", json={"food": "rice"})
+    assert len(client.get("/admin/profile", headers=AUTH).get_json()["reports"]) == 30
+
+
+@pytest.mark.parametrize("value", [True, False, 0, 51, -1, 2.5, "5", None])
+def test_bounded_int_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        act_app._bounded_int({"requests": value}, "requests", 5, 1, 50)
+
+
+def test_bounded_int_default_and_bounds():
+    assert act_app._bounded_int({}, "requests", 5, 1, 50) == 5
+    assert act_app._bounded_int({"requests": 1}, "requests", 5, 1, 50) == 1
+    assert act_app._bounded_int({"requests": 50}, "requests", 5, 1, 50) == 50
+
+
+def test_run_profiled_notes_missing_child_profile_on_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(act_app.tempfile, "tempdir", str(tmp_path))
+    script = tmp_path / "slow.py"
+    script.write_text("import time\ntime.sleep(30)\n")
+    session = profiling.ProfileSession(1, 10, 5, 5)
+    profile = profiling.RequestProfile(session, "POST /test")
+    try:
+        with pytest.raises(act_app.subprocess.TimeoutExpired):
+            act_app._run_profiled(script, b"{}", 1, dict(os.environ), profile)
+    finally:
+        profile.sampler.stop()
+
+    (child,) = profile.children
+    assert child["script"] == "slow.py"
+    assert child["note"] == "Child profile unavailable (script killed or crashed)"
+    assert not list(tmp_path.glob("act-profile-*"))
+
+
+def test_run_script_profiles_child_script(tmp_path, monkeypatch):
+    monkeypatch.setattr(act_app.tempfile, "tempdir", str(tmp_path))
+    script = tmp_path / "nova_act_fake.py"
+    script.write_text(
+        "import json, sys, time\n"
+        "data = json.load(sys.stdin)\n"
+        "blocks = [bytearray(64 * 1024) for _ in range(32)]\n"
+        "time.sleep(0.2)\n"
+        "print(json.dumps({'food': data['food'], 'blocks': len(blocks)}))\n"
+    )
+    session = profiling.ProfileSession(1, 1, 5, 10)
+
+    with act_app.app.test_request_context("/nutrition", method="POST"):
+        profile = profiling.RequestProfile(session, "POST /nutrition")
+        act_app.g.profile = profile
+        result = act_app.run_script(script, {"food": "rice"}, timeout=30)
+        report = profile.finish(200)
+
+    assert result == {"food": "rice", "blocks": 32}
+    (child,) = report["children"]
+    assert child["script"] == "nova_act_fake.py"
+    assert "note" not in child
+    assert child["samples"] > 0
+    assert any(a["file"].endswith("nova_act_fake.py") and a["sizeDiffKb"] >= 2048 for a in child["allocations"])
+    assert child["tracemallocOverheadKb"] > 0
+    assert set(child["rss"]) == {"childKb", "browserKb", "treeKb", "browserProcesses"}
+    assert "collapsed" not in child
+
+    child_lines = [l for l in report["collapsed"].splitlines() if l.startswith("POST /nutrition;nova_act_fake.py;")]
+    assert child_lines
+    assert any("nova_act_fake.py:4" in l for l in child_lines)
+    assert all(l.rsplit(" ", 1)[1].isdigit() for l in child_lines)
+    assert not list(tmp_path.glob("act-profile-*"))
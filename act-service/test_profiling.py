@@ -0,0 +1,52 @@
+import pytest
+
+import profiling
+
+
+def _write_status(root, pid, name, ppid, rss="1024 kB"):
+    proc_dir = root / str(pid)
+    proc_dir.mkdir()
+    lines = [f"Name:\t{name}", "State:\tS (sleeping)", f"PPid:\t{ppid}"]
+    if rss is not None:
+        lines.append(f"VmRSS:\t   {rss}")
+    (proc_dir / "status").write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def fake_proc(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROC_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def test_proc_status_reads_name_ppid_and_rss(fake_proc):
+    _write_status(fake_proc, 42, "python3", 1, "2048 kB")
+    assert profiling._proc_status(42) == {"name": "python3", "ppid": 1, "rssKb": 2048}
+
+
+def test_proc_status_missing_or_kernel_thread(fake_proc):
+    assert profiling._proc_status(99) == {}
+    # Kernel threads have no VmRSS line
+    _write_status(fake_proc, 2, "kthreadd", 0, rss=None)
+    assert profiling._proc_status(2)["rssKb"] == 0
+
+
+def test_process_tree_walks_descendants_only(fake_proc):
+    _write_status(fake_proc, 1, "init", 0)
+    _write_status(fake_proc, 100, "python3", 1, "5000 kB")
+    _write_status(fake_proc, 101, "node", 100, "300 kB")
+    _write_status(fake_proc, 102, "chrome", 101, "90000 kB")
+    _write_status(fake_proc, 103, "chrome", 102, "40000 kB")
+    _write_status(fake_proc, 200, "unrelated", 1)
+    (fake_proc / "self").mkdir()
+
+    tree = profiling.process_tree(100)
+
+    assert sorted(p["pid"] for p in tree) == [101, 102, 103]
+    browsers = [p for p in tree if profiling._is_browser(p["name"])]
+    assert sum(p["rssKb"] for p in browsers) == 130000
+
+
+def test_process_tree_without_proc(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROC_ROOT", str(tmp_path / "missing"))
+    assert profiling.process_tree(1) == []
+    assert profiling.rss_kb(1) is None